@@ -1,8 +1,15 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for, g, has_request_context
 from flask_cors import CORS
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from contextlib import contextmanager
-import sqlite3, os, re
+from collections import OrderedDict, Counter
+from logging.handlers import QueueHandler, QueueListener
+from urllib.parse import quote
+try:
+    import fcntl
+except ImportError:   # Windows (dezvoltare locală): fără alegerea unui singur worker
+    fcntl = None
+import sqlite3, os, re, io, sys, csv, json, queue, hashlib, logging, threading, atexit, weakref, time as _time
 
 # ======================================
 # CONFIGURARE APLICAȚIE
@@ -28,43 +35,516 @@ else:
     )
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "database.db")
+DB_PATH = os.environ.get("DB_PATH", os.path.join(BASE_DIR, "database.db"))
 EMAIL_FILE = os.path.join(BASE_DIR, "allowed_emails.txt")
 ADMIN_PWD = os.environ.get("ADMIN_PWD", "admin1234")
 
+# Intervalele orare și mașinile disponibile (calculate o singură dată)
+ORE = [f"{h:02d}:00" for h in range(7, 7 + 16)]
+MASINI = [f"Mașina {i}" for i in range(1, 5)]
+ORA_IDX = {t: i for i, t in enumerate(ORE)}
+MASINA_IDX = {m: i for i, m in enumerate(MASINI)}
+
+# Cache ocupare: câte zile ținem în memorie și cât timp e valabilă o intrare
+# (TTL-ul limitează datele învechite când rulează mai mulți workeri gunicorn)
+CACHE_MAX_DAYS = int(os.environ.get("CACHE_MAX_DAYS", "256"))
+CACHE_TTL = float(os.environ.get("CACHE_TTL", "30"))
+
+# Câte rezervări poate face un utilizator într-o zi
+MAX_REZERVARI_PE_ZI = 2
+
+# Intervalul maxim (în zile) acceptat de /api/availability
+AVAILABILITY_MAX_DAYS = 62
+
+# Paginare listă admin (keyset) și mărimea bucăților la export
+ADMIN_PAGE_SIZE = 200
+ADMIN_PAGE_MAX = 1000
+EXPORT_CHUNK = 1000
+
+# Notificări live (SSE): cât de des citim jurnalul de modificări, câte evenimente
+# poate ține în așteptare un client lent, câte rânduri păstrăm în jurnal
+SSE_POLL_INTERVAL = float(os.environ.get("SSE_POLL_INTERVAL", "0.5"))
+SSE_CLIENT_BUFFER = 64
+SSE_MAX_DATES = 31
+# un flux închis de client e observat abia la următoarea scriere, deci keepalive-ul
+# scurt eliberează repede locul (ex. la schimbarea zilei în calendar)
+SSE_KEEPALIVE = float(os.environ.get("SSE_KEEPALIVE", "5"))
+SSE_MAX_SECONDS = 300     # clientul (EventSource) se reconectează singur după
+# Fiecare flux SSE ține ocupat un thread de worker (gthread) cât e deschis; limita
+# trebuie să rămână mult sub --threads ca /api/book și /api/timeslots să aibă thread-uri
+SSE_MAX_STREAMS = int(os.environ.get("SSE_MAX_STREAMS", "4"))
+SSE_LOG_KEEP = 10000
+
+# Metrici: limitele histogramelor (secunde / număr de interogări) și tokenuri opționale
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")      # dacă e setat, /metrics cere Bearer token
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN")      # dacă e setat, header-ul X-Profile pornește profilerul
+PROFILE_INTERVAL = 0.001
+
+# Retenție: rezervările mai vechi de RETENTION_DAYS zile sunt mutate în arhivă,
+# în tranzacții mici de câte RETENTION_BATCH rânduri, la fiecare RETENTION_INTERVAL secunde
+RETENTION_ENABLED = os.environ.get("RETENTION_ENABLED", "1") == "1"
+RETENTION_DAYS = int(os.environ.get("RETENTION_DAYS", "30"))
+RETENTION_INTERVAL = int(os.environ.get("RETENTION_INTERVAL", "3600"))
+RETENTION_BATCH = 500
+DELETE_CHUNK = 500
+CHUNK_PAUSE = 0.005        # pauză între bucăți, ca rezervările noi să prindă lacătul
+VACUUM_PAGES = 1000
+
+# Setări SQLite aplicate fiecărei conexiuni (o singură dată, la deschidere)
+DB_BUSY_TIMEOUT_MS = 30000
+DB_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-8000",        # ~8 MB cache de pagini
+    "PRAGMA mmap_size=67108864",      # 64 MB memory-mapped I/O
+    "PRAGMA temp_store=MEMORY",
+    f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}",
+)
+DB_STATEMENT_CACHE = 128
+
+
+# ======================================
+# METRICI ȘI LOGGING
+# ======================================
+
+class Metrics:
+    """Contoare, gauge-uri și histograme în memoria procesului, exportate în format Prometheus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}     # (nume, etichete) -> valoare
+        self._gauges = {}       # (nume, etichete) -> valoare sau funcție apelată la export
+        self._hists = {}        # (nume, etichete) -> [buckets, contoare, sumă, număr]
+        self._help = {}
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """Setează un gauge; `value` poate fi și o funcție, evaluată la fiecare export."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            h = self._hists.get(key)
+            if h is None:
+                h = self._hists[key] = [buckets, [0] * len(buckets), 0.0, 0]
+            for i, b in enumerate(buckets):
+                if value <= b:
+                    h[1][i] += 1
+                    break
+            h[2] += value
+            h[3] += 1
+
+    @staticmethod
+    def _labels(pairs, extra=()):
+        pairs = tuple(pairs) + tuple(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items(), key=lambda kv: kv[0])
+            hists = sorted((k, (h[0], list(h[1]), h[2], h[3])) for k, h in self._hists.items())
+        out, seen = [], set()
+
+        def header(name):
+            if name not in seen and name in self._help:
+                kind, text = self._help[name]
+                out.append(f"# HELP {name} {text}")
+                out.append(f"# TYPE {name} {kind}")
+            seen.add(name)
+
+        for (name, labels), value in counters:
+            header(name)
+            out.append(f"{name}{self._labels(labels)} {value}")
+        for (name, labels), value in gauges:
+            header(name)
+            out.append(f"{name}{self._labels(labels)} {value() if callable(value) else value}")
+        for (name, labels), (buckets, counts, total, n) in hists:
+            header(name)
+            cumul = 0
+            for b, c in zip(buckets, counts):
+                cumul += c
+                out.append(f"{name}_bucket{self._labels(labels, [('le', b)])} {cumul}")
+            out.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {n}")
+            out.append(f"{name}_sum{self._labels(labels)} {total:.6f}")
+            out.append(f"{name}_count{self._labels(labels)} {n}")
+        return "\n".join(out) + "\n"
+
+
+metrics = Metrics()
+metrics.describe("t5_http_request_duration_seconds", "histogram", "Durata cererilor HTTP, pe rută")
+metrics.describe("t5_sql_statements_per_request", "histogram", "Numărul de interogări SQL per cerere")
+metrics.describe("t5_sql_duration_seconds", "histogram", "Timpul petrecut în baza de date per cerere")
+metrics.describe("t5_db_lock_wait_seconds", "histogram", "Așteptarea lacătului de scriere (BEGIN IMMEDIATE)")
+metrics.describe("t5_cache_requests_total", "counter", "Accesări ale cache-urilor (hit/miss)")
+metrics.describe("t5_sse_clients", "gauge", "Clienți SSE conectați la acest worker")
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {"ts": datetime.fromtimestamp(record.created, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+                 "level": record.levelname.lower(), "event": record.getMessage()}
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+log = logging.getLogger("t5")
+log.setLevel(logging.INFO)
+log.propagate = False
+_log_queue = queue.SimpleQueue()
+log.addHandler(QueueHandler(_log_queue))
+_log_state = {"pid": None, "listener": None}
+_log_lock = threading.Lock()
+
+
+def _start_log_listener():
+    """Scrierea efectivă pe stdout se face într-un thread separat, nu pe calea cererii."""
+    if _log_state["pid"] == os.getpid():
+        return
+    with _log_lock:
+        # un singur listener per proces, chiar dacă primele cereri vin în paralel
+        if _log_state["pid"] == os.getpid():
+            return
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonFormatter())
+        listener = QueueListener(_log_queue, stream)
+        listener.start()
+        _log_state.update(pid=os.getpid(), listener=listener)
+
+
+def stop_log_listener():
+    if _log_state["listener"] is not None and _log_state["pid"] == os.getpid():
+        _log_state["listener"].stop()
+    _log_state.update(pid=None, listener=None)
+
+
+def log_event(event, level=logging.INFO, **fields):
+    _start_log_listener()
+    log.log(level, event, extra={"fields": fields})
+
+
+atexit.register(stop_log_listener)
+
+
+def _count_statement(_sql):
+    if has_request_context():
+        g.sql_count = g.get("sql_count", 0) + 1
+
+
+def _add_sql_time(t0):
+    if has_request_context():
+        g.sql_time = g.get("sql_time", 0.0) + _time.perf_counter() - t0
+
+
+class TimedCursor:
+    """Cursor care adaugă la g.sql_time timpul petrecut în SQLite (execuție + citire rânduri)."""
+
+    def __init__(self, cur):
+        self._cur = cur
+
+    def fetchone(self):
+        t0 = _time.perf_counter()
+        try:
+            return self._cur.fetchone()
+        finally:
+            _add_sql_time(t0)
+
+    def fetchall(self):
+        t0 = _time.perf_counter()
+        try:
+            return self._cur.fetchall()
+        finally:
+            _add_sql_time(t0)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+class TimedConnection:
+    """Conexiune cu interogările cronometrate individual (fără codul Python dintre ele)."""
+
+    def __init__(self, conn):
+        self.raw = conn
+
+    def execute(self, sql, params=()):
+        t0 = _time.perf_counter()
+        try:
+            return TimedCursor(self.raw.execute(sql, params))
+        finally:
+            _add_sql_time(t0)
+
+    def executescript(self, sql):
+        t0 = _time.perf_counter()
+        try:
+            return self.raw.executescript(sql)
+        finally:
+            _add_sql_time(t0)
+
+    def commit(self):
+        t0 = _time.perf_counter()
+        try:
+            self.raw.commit()
+        finally:
+            _add_sql_time(t0)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+class SamplingProfiler:
+    """Eșantionează stiva unui thread la fiecare `interval` secunde (profiler pentru o cerere)."""
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="t5-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
 
 # ======================================
 # CONEXIUNE BAZĂ DE DATE
 # ======================================
 
-@contextmanager
-def get_db():
-    conn = sqlite3.connect(DB_PATH, timeout=30)
+_db_local = threading.local()
+# toate conexiunile deschise, pentru închidere la shutdown; referințe slabe, ca
+# la terminarea unui fir conexiunea lui (ținută doar de _db_local) să fie eliberată
+_db_conns = weakref.WeakSet()
+_db_conns_lock = threading.Lock()
+
+
+class _WeakConn(sqlite3.Connection):
+    """sqlite3.Connection nu acceptă referințe slabe; subclasa le acceptă."""
+
+
+def _open_conn(readonly):
+    # fiecare conexiune e folosită doar de firul care a deschis-o; check_same_thread=False
+    # permite doar închiderea ei din alt fir, la shutdown
+    if readonly:
+        conn = sqlite3.connect(f"file:{quote(DB_PATH)}?mode=ro", uri=True,
+                               timeout=DB_BUSY_TIMEOUT_MS / 1000, cached_statements=DB_STATEMENT_CACHE,
+                               check_same_thread=False, factory=_WeakConn)
+    else:
+        conn = sqlite3.connect(DB_PATH, timeout=DB_BUSY_TIMEOUT_MS / 1000,
+                               cached_statements=DB_STATEMENT_CACHE, check_same_thread=False,
+                               factory=_WeakConn)
     conn.row_factory = sqlite3.Row
+    conn.set_trace_callback(_count_statement)
+    for pragma in DB_PRAGMAS:
+        conn.execute(pragma)
+    with _db_conns_lock:
+        _db_conns.add(conn)
+    return conn
+
+
+def _thread_conn(readonly):
+    """Conexiunea (rw sau ro) a thread-ului curent, refolosită între cereri.
+
+    Conexiunile moștenite printr-un fork (gunicorn --preload) nu sunt refolosite.
+    """
+    pid = os.getpid()
+    if getattr(_db_local, "pid", None) != pid:
+        _db_local.pid = pid
+        _db_local.conns = {}
+    conn = _db_local.conns.get(readonly)
+    if conn is None:
+        conn = _db_local.conns[readonly] = _open_conn(readonly)
+    return conn
+
+
+@contextmanager
+def get_db(readonly=False, immediate=False):
+    """Conexiunea thread-ului; commit la ieșire, rollback la excepție.
+
+    immediate=True ia lacătul de scriere de la început (BEGIN IMMEDIATE);
+    timpul de așteptare apare în metrica t5_db_lock_wait_seconds.
+    """
+    conn = TimedConnection(_thread_conn(readonly))
     try:
+        if immediate:
+            # așteptarea lacătului are metrica ei; nu intră în t5_sql_duration_seconds
+            t0 = _time.perf_counter()
+            conn.raw.execute("BEGIN IMMEDIATE")
+            metrics.observe("t5_db_lock_wait_seconds", _time.perf_counter() - t0)
         yield conn
         conn.commit()
     except Exception:
         conn.rollback()
         raise
-    finally:
+
+
+def release_thread_db():
+    """Închide conexiunile thread-ului curent; pentru thread-urile de fundal care se opresc."""
+    conns = getattr(_db_local, "conns", {}) if getattr(_db_local, "pid", None) == os.getpid() else {}
+    with _db_conns_lock:
+        for conn in conns.values():
+            _db_conns.discard(conn)
+    for conn in conns.values():
         conn.close()
+    _db_local.__dict__.clear()
+
+
+def close_db_connections():
+    """Închide toate conexiunile deschise de procesul curent (apelată la ieșire)."""
+    with _db_conns_lock:
+        conns = list(_db_conns)
+        _db_conns.clear()
+    for conn in conns:
+        conn.close()
+    _db_local.__dict__.clear()
+
+
+atexit.register(close_db_connections)
+
+
+def _migrare_date_iso(conn):
+    """Datele DD-MM-YYYY devin YYYY-MM-DD (sortabile, scanabile pe interval)."""
+    conn.execute("""
+        UPDATE OR IGNORE reservations
+        SET date = substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || substr(date, 1, 2)
+        WHERE date GLOB '[0-9][0-9]-[0-9][0-9]-[0-9][0-9][0-9][0-9]'
+    """)
+    # rămân doar duplicatele aceluiași slot salvate în ambele formate
+    cur = conn.execute("DELETE FROM reservations WHERE date GLOB '[0-9][0-9]-[0-9][0-9]-[0-9][0-9][0-9][0-9]'")
+    if cur.rowcount:
+        log_event("migration_duplicates_removed", rows=cur.rowcount)
+
+
+def _migrare_indexuri(conn):
+    # cota zilnică și lista per utilizator (ordonată după dată, oră)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reservations_email_date ON reservations(email, date, time)")
+    # grila unei zile / ocuparea pe interval, fără acces la tabel
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reservations_date_time ON reservations(date, time, machine, room)")
+
+
+def _migrare_jurnal_sloturi(conn):
+    # jurnal de modificări citit de toți workerii pentru notificările live
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS slot_changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT,
+            time TEXT,
+            machine TEXT,
+            room TEXT,
+            booked INTEGER NOT NULL
+        )
+    """)
+
+
+def _migrare_arhiva(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS reservations_archive (
+            id INTEGER PRIMARY KEY,
+            email TEXT NOT NULL,
+            room TEXT NOT NULL,
+            date TEXT NOT NULL,
+            time TEXT NOT NULL,
+            machine TEXT NOT NULL,
+            created_at TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_archive_date ON reservations_archive(date)")
+
+
+# Migrările se aplică în ordine; versiunea curentă e ținută în PRAGMA user_version
+MIGRATIONS = [
+    _migrare_date_iso,
+    _migrare_indexuri,
+    _migrare_jurnal_sloturi,
+    _migrare_arhiva,
+]
+
+
+def migrate_db(conn):
+    aplicate = 0
+    for nr, migrare in enumerate(MIGRATIONS, start=1):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # versiunea se citește sub lacătul de scriere: alt worker poate să fi migrat deja baza
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= nr:
+                conn.commit()
+                continue
+            migrare(conn)
+            conn.execute(f"PRAGMA user_version={nr}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        aplicate += 1
+        log_event("migration_applied", version=nr, name=migrare.__name__)
+    if aplicate:
+        conn.execute("ANALYZE")
 
 
 def init_db():
-    with get_db() as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS reservations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT NOT NULL,
-                room TEXT NOT NULL,
-                date TEXT NOT NULL,
-                time TEXT NOT NULL,
-                machine TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(date, time, machine)
-            )
-        """)
+    # workerii pornesc simultan; lacătul pe fișier serializează migrările și VACUUM-ul inițial
+    with open(DB_PATH + ".init.lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)   # eliberat la închiderea fișierului
+        with get_db() as conn:
+            # WAL e persistent în fișierul bazei de date: cititorii nu mai așteaptă după scrieri
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS reservations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    email TEXT NOT NULL,
+                    room TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    time TEXT NOT NULL,
+                    machine TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(date, time, machine)
+                )
+            """)
+            migrate_db(conn)
+        with get_db() as conn:
+            # spațiul eliberat de retenție se recuperează cu PRAGMA incremental_vacuum;
+            # trecerea unei baze existente la auto_vacuum cere un VACUUM complet (o singură dată)
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.execute("VACUUM")
+                log_event("auto_vacuum_enabled")
 init_db()
 
 
@@ -72,12 +552,501 @@ init_db()
 # FUNCȚII UTILE
 # ======================================
 
-def load_allowed_emails():
-    if not os.path.exists(EMAIL_FILE):
-        with open(EMAIL_FILE, "w") as f:
-            f.write("test@example.com\n")
-    with open(EMAIL_FILE, "r") as f:
-        return [line.strip().lower() for line in f if line.strip()]
+class AllowList:
+    """Lista de emailuri permise, citită din EMAIL_FILE doar când fișierul se schimbă.
+
+    Linii acceptate: "nume@domeniu", "*@domeniu" (tot domeniul) și
+    "*@*.domeniu" (orice subdomeniu). Schimbarea e detectată după
+    (mtime, dimensiune, inode), deci și modificările făcute de alt worker.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._sig = None
+        self._data = (frozenset(), frozenset(), ())   # emailuri, domenii, sufixe
+
+    def _signature(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    @staticmethod
+    def _parse(lines):
+        emails, domains, suffixes = set(), set(), set()
+        for line in lines:
+            e = line.strip().lower()
+            if not e or e.startswith("#"):
+                continue
+            if e.startswith("*@*."):
+                suffixes.add(e[3:])          # ".domeniu"
+            elif e.startswith("*@"):
+                domains.add(e[2:])
+            else:
+                emails.add(e)
+        return frozenset(emails), frozenset(domains), tuple(sorted(suffixes))
+
+    def _refresh(self):
+        if not os.path.exists(self.path):
+            with open(self.path, "w") as f:
+                f.write("test@example.com\n")
+        sig = self._signature()
+        if sig == self._sig:
+            metrics.inc("t5_cache_requests_total", cache="allow_list", result="hit")
+            return
+        with self._lock:
+            if sig == self._sig:
+                return
+            metrics.inc("t5_cache_requests_total", cache="allow_list", result="miss")
+            with open(self.path, "r") as f:
+                self._data = self._parse(f)
+            self._sig = sig
+
+    def __contains__(self, email):
+        self._refresh()
+        emails, domains, suffixes = self._data
+        if email in emails:
+            return True
+        domain = email.rpartition("@")[2]
+        return domain in domains or domain.endswith(suffixes)
+
+    def entries(self):
+        self._refresh()
+        emails, domains, suffixes = self._data
+        return sorted(emails) + [f"*@{d}" for d in sorted(domains)] + [f"*@*{x}" for x in suffixes]
+
+    def update(self, add=(), remove=()):
+        """Adaugă/șterge intrări și rescrie fișierul atomic; întoarce (adăugate, șterse, total)."""
+        add = {e.strip().lower() for e in add if e and e.strip()}
+        remove = {e.strip().lower() for e in remove if e and e.strip()}
+        self._refresh()   # creează fișierul dacă lipsește
+        # lacătul pe fișier serializează editările între workeri (cel din thread-uri nu o face)
+        with self._lock, open(self.path + ".lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)   # eliberat la închiderea fișierului
+            self._sig = None
+            with open(self.path, "r") as f:
+                current = [line.strip().lower() for line in f if line.strip()]
+            existing = set(current)
+            kept = [e for e in current if e not in remove]
+            added = sorted(add - existing - remove)
+            result = kept + added
+            tmp = f"{self.path}.tmp{os.getpid()}"
+            with open(tmp, "w") as f:
+                f.write("\n".join(result) + "\n")
+            os.replace(tmp, self.path)
+        return len(added), len(current) - len(kept), len(result)
+
+
+allowed_emails = AllowList(EMAIL_FILE)
+
+
+def parse_date(value):
+    """Acceptă YYYY-MM-DD sau DD-MM-YYYY; întoarce datetime.date sau None."""
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def normalize_date(value):
+    """Data în formatul din DB (YYYY-MM-DD) sau None dacă e invalidă."""
+    d = parse_date(value)
+    return d.isoformat() if d else None
+
+
+def zile_interval(start, end):
+    """Lista datelor YYYY-MM-DD din intervalul [start, end] (datetime.date)."""
+    return [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+
+
+# ======================================
+# CACHE OCUPARE (per dată)
+# ======================================
+
+class OccupancyCache:
+    """Grila (oră, mașină) -> cameră pentru fiecare dată, ținută în memoria procesului.
+
+    Fiecare intrare păstrează și răspunsul JSON serializat + ETag-ul lui, astfel
+    încât o zi nemodificată se servește (sau primește 304) fără acces la DB.
+    Fiecare dată are și o versiune, mărită la orice modificare (chiar dacă data
+    nu e în cache): fill() nu salvează o grilă citită înaintea unei modificări.
+    """
+
+    def __init__(self, max_days=CACHE_MAX_DAYS, ttl=CACHE_TTL):
+        self.max_days = max_days
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._days = OrderedDict()  # date -> [grid, etag, body, expires]
+        self._versions = {}         # date -> număr de modificări văzute
+        self._generation = 0        # crește la invalidate() total
+
+    @staticmethod
+    def _render(date_str, grid):
+        timeslots = [
+            {
+                "time": t,
+                "machines": [
+                    {"name": m, "booked": grid[i][j] is not None, "booked_by": grid[i][j]}
+                    for j, m in enumerate(MASINI)
+                ],
+            }
+            for i, t in enumerate(ORE)
+        ]
+        body = json.dumps({"success": True, "date": date_str, "timeslots": timeslots},
+                          ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        etag = hashlib.sha1(body).hexdigest()[:20]
+        return etag, body
+
+    def _store(self, date_str, grid):
+        etag, body = self._render(date_str, grid)
+        self._days[date_str] = [grid, etag, body, _time.monotonic() + self.ttl]
+        self._days.move_to_end(date_str)
+        while len(self._days) > self.max_days:
+            self._days.popitem(last=False)
+        return etag, body
+
+    def get(self, date_str):
+        """Întoarce (etag, body) din cache sau None dacă data lipsește/a expirat."""
+        with self._lock:
+            entry = self._days.get(date_str)
+            if entry is not None and entry[3] < _time.monotonic():
+                del self._days[date_str]
+                entry = None
+            if entry is None:
+                metrics.inc("t5_cache_requests_total", cache="occupancy", result="miss")
+                return None
+            self._days.move_to_end(date_str)
+        metrics.inc("t5_cache_requests_total", cache="occupancy", result="hit")
+        return entry[1], entry[2]
+
+    def _bump(self, date_str):
+        self._versions[date_str] = self._versions.get(date_str, 0) + 1
+
+    def version(self, date_str):
+        """Versiunea datei; se citește ÎNAINTE de interogarea DB și se dă lui fill()."""
+        with self._lock:
+            return self._generation, self._versions.get(date_str, 0)
+
+    def fill(self, date_str, rows, version):
+        """Construiește grila din rândurile (time, machine, room) citite din DB.
+
+        Grila intră în cache doar dacă data nu s-a modificat de la `version`;
+        altfel e folosită numai pentru răspunsul curent.
+        """
+        grid = [[None] * len(MASINI) for _ in ORE]
+        for r in rows:
+            i, j = ORA_IDX.get(r["time"]), MASINA_IDX.get(r["machine"])
+            if i is not None and j is not None:
+                grid[i][j] = r["room"]
+        with self._lock:
+            if version == (self._generation, self._versions.get(date_str, 0)):
+                return self._store(date_str, grid)
+        return self._render(date_str, grid)
+
+    def set_slot(self, date_str, time_str, machine, room):
+        """Actualizează o celulă după un commit (room=None => slot eliberat)."""
+        with self._lock:
+            self._bump(date_str)
+            entry = self._days.get(date_str)
+            if entry is None:
+                return
+            i, j = ORA_IDX.get(time_str), MASINA_IDX.get(machine)
+            if i is None or j is None:
+                del self._days[date_str]
+                return
+            entry[0][i][j] = room
+            self._store(date_str, entry[0])
+
+    def invalidate(self, date_str=None):
+        with self._lock:
+            if date_str is None:
+                self._generation += 1
+                self._days.clear()
+            else:
+                self._bump(date_str)
+                self._days.pop(date_str, None)
+
+
+occupancy = OccupancyCache()
+
+
+# ======================================
+# NOTIFICĂRI LIVE (SSE)
+# ======================================
+
+def log_change(conn, date, time, machine, room=None, booked=False):
+    """Scrie o modificare în jurnal, în aceeași tranzacție cu rezervarea.
+
+    date=None înseamnă „toate rezervările au fost șterse”; date setat și
+    time=None înseamnă „mai multe sloturi din această zi s-au schimbat”.
+    """
+    cur = conn.execute("INSERT INTO slot_changes (date, time, machine, room, booked) VALUES (?, ?, ?, ?, ?)",
+                       (date, time, machine, room, int(booked)))
+    conn.execute("DELETE FROM slot_changes WHERE id <= ?", (cur.lastrowid - SSE_LOG_KEEP,))
+
+
+def change_event(row):
+    if row["date"] is None:
+        return {"reset": True}
+    if row["time"] is None:
+        return {"date": row["date"], "reset": True}
+    return {"date": row["date"], "time": row["time"], "machine": row["machine"],
+            "booked": bool(row["booked"]), "booked_by": row["room"]}
+
+
+class SseClient:
+    def __init__(self, dates, start_id):
+        self.dates = dates
+        self.start_id = start_id
+        self.events = queue.Queue(maxsize=SSE_CLIENT_BUFFER)
+        self.overflow = False
+
+
+class SlotBroadcaster:
+    """Distribuie modificările din slot_changes către clienții SSE ai procesului.
+
+    Un singur thread per worker citește jurnalul (doar cât timp există
+    abonați), deci modificările făcute de orice worker ajung la toți clienții.
+    Fiecare client are o coadă limitată; dacă se umple, clientul primește
+    un eveniment „resync” în loc de evenimentele pierdute.
+    """
+
+    def __init__(self, poll=SSE_POLL_INTERVAL):
+        self.poll = poll
+        self._lock = threading.Lock()
+        self._clients = set()
+        self._thread = None
+        self._last_id = 0
+
+    def _max_id(self):
+        with get_db(readonly=True) as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM slot_changes").fetchone()[0]
+
+    def subscribe(self, dates):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._last_id = self._max_id()
+                self._thread = threading.Thread(target=self._run, name="sse-broadcaster", daemon=True)
+                self._thread.start()
+            client = SseClient(dates, self._last_id)
+            self._clients.add(client)
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._clients.discard(client)
+
+    def client_count(self):
+        with self._lock:
+            return len(self._clients)
+
+    def _dispatch(self, row):
+        event = (row["id"], change_event(row))
+        # _last_id și lista de clienți se schimbă împreună: un client abonat înainte primește
+        # rândul aici, unul abonat după are start_id >= id și îl primește din replay
+        with self._lock:
+            self._last_id = row["id"]
+            clients = list(self._clients)
+        for client in clients:
+            if row["date"] is not None and row["date"] not in client.dates:
+                continue
+            try:
+                client.events.put_nowait(event)
+            except queue.Full:
+                client.overflow = True
+
+    def _run(self):
+        while True:
+            _time.sleep(self.poll)
+            with self._lock:
+                if not self._clients:
+                    self._thread = None
+                    break
+            try:
+                with get_db(readonly=True) as conn:
+                    rows = conn.execute("SELECT * FROM slot_changes WHERE id > ? ORDER BY id LIMIT 500",
+                                        (self._last_id,)).fetchall()
+            except sqlite3.Error as e:
+                log_event("sse_poll_error", logging.WARNING, error=str(e))
+                continue
+            for row in rows:
+                # ținem la zi și cache-ul de ocupare al acestui worker
+                if row["date"] is None:
+                    occupancy.invalidate()
+                elif row["time"] is None:
+                    occupancy.invalidate(row["date"])
+                else:
+                    occupancy.set_slot(row["date"], row["time"], row["machine"],
+                                       row["room"] if row["booked"] else None)
+                self._dispatch(row)
+        release_thread_db()
+
+
+broadcaster = SlotBroadcaster()
+metrics.set("t5_sse_clients", broadcaster.client_count)
+sse_slots = threading.BoundedSemaphore(SSE_MAX_STREAMS)   # fluxuri SSE simultane per worker
+
+
+def sse_format(event, data, event_id=None):
+    msg = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n"
+    if event_id is not None:
+        msg = f"id: {event_id}\n" + msg
+    return msg + "\n"
+
+
+# ======================================
+# RETENȚIE / ȘTERGERI ÎN BUCĂȚI
+# ======================================
+
+def delete_in_chunks(where="1", params=(), chunk=DELETE_CHUNK, reset_all=False):
+    """Șterge rezervările care satisfac `where` în tranzacții scurte de câte `chunk` rânduri.
+
+    Întoarce (rânduri șterse, număr de bucăți). Între bucăți lacătul de scriere
+    e eliberat, deci rezervările noi așteaptă cel mult o bucată. Fiecare bucată
+    notifică doar zilele atinse; cu reset_all=True se scrie un singur reset
+    global, la final.
+    """
+    deleted = batches = 0
+    while True:
+        with get_db(immediate=True) as conn:
+            rows = conn.execute(
+                f"DELETE FROM reservations WHERE id IN (SELECT id FROM reservations WHERE {where} LIMIT ?) "
+                f"RETURNING date", (*params, chunk)
+            ).fetchall()
+            dates = {r["date"] for r in rows}
+            if not reset_all:
+                for date in dates:
+                    log_change(conn, date, None, None)
+        for date in dates:
+            occupancy.invalidate(date)
+        deleted += len(rows)
+        batches += 1
+        if len(rows) < chunk:
+            break
+        _time.sleep(CHUNK_PAUSE)
+
+    if reset_all and deleted:
+        with get_db(immediate=True) as conn:
+            log_change(conn, None, None, None)
+        occupancy.invalidate()
+    return deleted, batches
+
+
+def archive_old_reservations(days=RETENTION_DAYS, batch=RETENTION_BATCH):
+    """Mută în reservations_archive rezervările mai vechi de `days` zile, apoi eliberează spațiul."""
+    horizon = (datetime.now().date() - timedelta(days=days)).isoformat()
+    moved = 0
+    while True:
+        with get_db(immediate=True) as conn:
+            ids = [r["id"] for r in conn.execute(
+                "SELECT id FROM reservations WHERE date < ? ORDER BY date LIMIT ?", (horizon, batch))]
+            if ids:
+                marks = ",".join("?" * len(ids))
+                conn.execute(f"""
+                    INSERT OR REPLACE INTO reservations_archive (id, email, room, date, time, machine, created_at)
+                    SELECT id, email, room, date, time, machine, created_at FROM reservations WHERE id IN ({marks})
+                """, ids)
+                conn.execute(f"DELETE FROM reservations WHERE id IN ({marks})", ids)
+        moved += len(ids)
+        if len(ids) < batch:
+            break
+        _time.sleep(CHUNK_PAUSE)
+
+    with get_db() as conn:
+        # executescript rulează pragma până la capăt (execute() ar elibera o singură pagină)
+        conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES})")
+    if moved:
+        occupancy.invalidate()
+        log_event("retention", archived=moved, horizon=horizon)
+    return moved
+
+
+_retention_state = {"pid": None}
+_retention_lock = threading.Lock()
+
+
+def _retention_loop():
+    lock_file = None
+    while True:
+        try:
+            if fcntl is not None and lock_file is None:
+                # un singur worker (cel care obține lacătul pe fișier) rulează retenția
+                f = open(DB_PATH + ".retention.lock", "a")
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    lock_file = f
+                except OSError:
+                    f.close()
+            if fcntl is None or lock_file is not None:
+                archive_old_reservations()
+        except Exception as e:
+            log_event("retention_error", logging.ERROR, error=str(e))
+        _time.sleep(RETENTION_INTERVAL)
+
+
+@app.before_request
+def start_retention():
+    """Pornește (o dată per proces, la prima cerere) thread-ul de retenție."""
+    if not RETENTION_ENABLED or _retention_state["pid"] == os.getpid():
+        return
+    with _retention_lock:
+        if _retention_state["pid"] == os.getpid():
+            return
+        _retention_state["pid"] = os.getpid()
+        threading.Thread(target=_retention_loop, name="t5-retention", daemon=True).start()
+
+
+# ======================================
+# INSTRUMENTARE CERERI
+# ======================================
+
+@app.before_request
+def start_timer():
+    g.t0 = _time.perf_counter()
+    g.sql_count = 0
+    g.sql_time = 0.0
+    if PROFILE_TOKEN and request.headers.get("X-Profile") == PROFILE_TOKEN:
+        g.profiler = SamplingProfiler(threading.get_ident()).start()
+
+
+@app.after_request
+def record_metrics(response):
+    if "t0" not in g:
+        return response
+    elapsed = _time.perf_counter() - g.t0
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.observe("t5_http_request_duration_seconds", elapsed,
+                    route=route, method=request.method, status=response.status_code)
+    metrics.observe("t5_sql_statements_per_request", g.sql_count, buckets=SQL_COUNT_BUCKETS, route=route)
+    metrics.observe("t5_sql_duration_seconds", g.sql_time, route=route)
+    response.headers["Server-Timing"] = f"app;dur={elapsed * 1000:.2f}, db;dur={g.sql_time * 1000:.2f}"
+
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        samples = profiler.stop()
+        log_event("profile", route=route, method=request.method, duration_ms=round(elapsed * 1000, 2),
+                  samples=sum(samples.values()), stacks=dict(samples.most_common(25)))
+        response.headers["X-Profile-Samples"] = str(sum(samples.values()))
+    return response
+
+
+@app.teardown_request
+def stop_profiler(exc):
+    """Oprește profilerul dacă record_metrics nu a rulat (ex. excepție într-un alt hook)."""
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        samples = profiler.stop()
+        log_event("profile", logging.WARNING, route=request.url_rule.rule if request.url_rule else "unmatched",
+                  method=request.method, samples=sum(samples.values()), error=repr(exc) if exc else None)
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return jsonify({"error": "Neautorizat"}), 401
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 
 # ======================================
@@ -112,13 +1081,12 @@ def check_email():
     if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
         return jsonify({"allowed": False, "message": "Format email invalid"})
 
-    allowed = load_allowed_emails()
-    if email in allowed:
+    if email in allowed_emails:
         session["email"] = email
-        print(f"[LOGIN ✅] {email}")
+        log_event("login", email=email, allowed=True)
         return jsonify({"allowed": True})
     else:
-        print(f"[LOGIN ❌] {email}")
+        log_event("login", email=email, allowed=False)
         return jsonify({"allowed": False, "message": "Email neautorizat"})
 
 
@@ -134,31 +1102,63 @@ def timeslots():
     date_str = request.args.get("date")
     if not date_str:
         return jsonify({"error": "Lipsă dată"}), 400
+    date_str = normalize_date(date_str)
+    if not date_str:
+        return jsonify({"error": "Dată invalidă"}), 400
 
-    start = datetime.strptime("07:00", "%H:%M")
-    ore = [(start + timedelta(hours=i)).strftime("%H:%M") for i in range(16)]
+    cached = occupancy.get(date_str)
+    if cached is None:
+        version = occupancy.version(date_str)
+        with get_db(readonly=True) as conn:
+            rows = conn.execute("SELECT time, machine, room FROM reservations WHERE date=?", (date_str,)).fetchall()
+        cached = occupancy.fill(date_str, rows, version)
+    etag, body = cached
 
-    with get_db() as conn:
-        rows = conn.execute("SELECT time, machine, room FROM reservations WHERE date=?", (date_str,)).fetchall()
+    if etag in request.if_none_match:
+        resp = app.response_class(status=304)
+    else:
+        resp = app.response_class(body, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
-    rezervari = {}
-    for r in rows:
-        rezervari.setdefault(r["time"], []).append({"machine": r["machine"], "room": r["room"]})
 
-    result = []
-    for t in ore:
-        masini = []
-        for i in range(1, 5):
-            nume = f"Mașina {i}"
-            rez = next((x for x in rezervari.get(t, []) if x["machine"] == nume), None)
-            masini.append({
-                "name": nume,
-                "booked": rez is not None,
-                "booked_by": rez["room"] if rez else None
-            })
-        result.append({"time": t, "machines": masini})
+@app.route("/api/availability")
+def availability():
+    """Ocuparea pe zile și ore pentru o lună (?month=MM-YYYY) sau un interval (?start=&end=)."""
+    if "email" not in session:
+        return jsonify({"error": "Neautentificat"}), 401
 
-    return jsonify({"success": True, "date": date_str, "timeslots": result})
+    month = request.args.get("month")
+    if month:
+        start = parse_date(f"01-{month}") or parse_date(f"{month}-01")
+        end = start and (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    else:
+        start = parse_date(request.args.get("start"))
+        end = parse_date(request.args["end"]) if "end" in request.args else start
+    if not start or not end or end < start or (end - start).days >= AVAILABILITY_MAX_DAYS:
+        return jsonify({"error": "Interval invalid"}), 400
+
+    zile = zile_interval(start, end)
+    with get_db(readonly=True) as conn:
+        rows = conn.execute(
+            "SELECT date, time, COUNT(*) AS n FROM reservations WHERE date BETWEEN ? AND ? GROUP BY date, time",
+            (zile[0], zile[-1])
+        ).fetchall()
+
+    days = {d: [0] * len(ORE) for d in zile}
+    for r in rows:
+        i = ORA_IDX.get(r["time"])
+        if i is not None:
+            days[r["date"]][i] = r["n"]
+
+    return jsonify({
+        "success": True,
+        "hours": ORE,
+        "machines": MASINI,
+        "capacity": len(ORE) * len(MASINI),
+        "days": {d: {"booked": sum(h), "hours": h} for d, h in days.items()},
+    })
 
 
 @app.route("/api/book", methods=["POST"])
@@ -170,22 +1170,43 @@ def book():
     date, time, room, machine = data.get("date"), data.get("time"), data.get("room"), data.get("machine")
     email = session["email"]
 
-    if not all([date, time, room, machine]):
+    # JSON-ul poate conține și liste sau numere; o listă în `time not in ORA_IDX` ar da TypeError (500)
+    if not all(isinstance(v, str) and v for v in (date, time, room, machine)):
         return jsonify({"success": False, "error": "Date incomplete"}), 400
+    date = normalize_date(date)
+    if not date:
+        return jsonify({"success": False, "error": "Dată invalidă"}), 400
+    if time not in ORA_IDX or machine not in MASINA_IDX:
+        return jsonify({"success": False, "error": "Oră sau mașină invalidă"}), 400
 
-    with get_db() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM reservations WHERE email=? AND date=?", (email, date))
-        if cur.fetchone()[0] >= 2:
-            return jsonify({"success": False, "error": "Maxim 2 rezervări/zi"}), 400
+    # IMMEDIATE: lacătul de scriere se ia de la început, deci verificarea cotei
+    # și inserarea nu pot fi intercalate cu altă rezervare
+    with get_db(immediate=True) as conn:
+        cur = conn.execute("""
+            INSERT INTO reservations (email, room, date, time, machine)
+            SELECT ?, ?, ?, ?, ?
+            WHERE (SELECT COUNT(*) FROM reservations WHERE email=? AND date=?) < ?
+            ON CONFLICT(date, time, machine) DO NOTHING
+        """, (email, room, date, time, machine, email, date, MAX_REZERVARI_PE_ZI))
 
-        try:
-            cur.execute("INSERT INTO reservations (email, room, date, time, machine) VALUES (?, ?, ?, ?, ?)",
-                        (email, room, date, time, machine))
-            print(f"[BOOKED] {email} ({room}) -> {date} {time}, {machine}")
-            return jsonify({"success": True})
-        except sqlite3.IntegrityError:
-            return jsonify({"success": False, "error": "Această mașină este deja rezervată"})
+        if cur.rowcount == 0:
+            # doar pe ramura de eșec aflăm motivul exact
+            taken = conn.execute("SELECT email FROM reservations WHERE date=? AND time=? AND machine=?",
+                                 (date, time, machine)).fetchone()
+            if taken is None:
+                return jsonify({"success": False, "reason": "quota",
+                                "error": f"Maxim {MAX_REZERVARI_PE_ZI} rezervări/zi"}), 400
+            if taken["email"] == email:
+                return jsonify({"success": False, "reason": "duplicate",
+                                "error": "Ai rezervat deja această mașină"})
+            return jsonify({"success": False, "reason": "taken",
+                            "error": "Această mașină este deja rezervată"})
+        log_change(conn, date, time, machine, room, booked=True)
+
+    # după commit: actualizăm grila din cache
+    occupancy.set_slot(date, time, machine, room)
+    log_event("booked", email=email, room=room, date=date, time=time, machine=machine)
+    return jsonify({"success": True})
 
 
 @app.route("/api/my_reservations")
@@ -193,7 +1214,7 @@ def my_reservations():
     if "email" not in session:
         return jsonify({"success": False, "error": "Neautentificat"}), 401
     email = session["email"]
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         rows = conn.execute(
             "SELECT id, date, time, machine, room FROM reservations WHERE email=? ORDER BY date, time",
             (email,)
@@ -211,28 +1232,236 @@ def delete_reservation():
     rid = data.get("id")
     email = session["email"]
 
-    with get_db() as conn:
-        cur = conn.execute("DELETE FROM reservations WHERE id=? AND email=?", (rid, email))
-        if cur.rowcount == 0:
+    with get_db(immediate=True) as conn:
+        rows = conn.execute("DELETE FROM reservations WHERE id=? AND email=? RETURNING date, time, machine",
+                           (rid, email)).fetchall()
+        if not rows:
             return jsonify({"success": False, "error": "Rezervarea nu există sau nu aparține utilizatorului"})
+        log_change(conn, rows[0]["date"], rows[0]["time"], rows[0]["machine"])
+    occupancy.set_slot(rows[0]["date"], rows[0]["time"], rows[0]["machine"], None)
     return jsonify({"success": True})
 
 
+@app.route("/api/events")
+def events():
+    """Flux SSE cu modificările sloturilor pentru datele cerute (?dates=d1,d2,...)."""
+    if "email" not in session:
+        return jsonify({"error": "Neautentificat"}), 401
+
+    raw = [d for d in (request.args.get("dates") or "").split(",") if d]
+    dates = {normalize_date(d) for d in raw}
+    if not raw or None in dates or len(dates) > SSE_MAX_DATES:
+        return jsonify({"error": "Date invalide"}), 400
+
+    try:
+        last_seen = int(request.headers.get("Last-Event-ID") or -1)
+    except ValueError:
+        last_seen = -1
+
+    # worker plin: 503, iar pagina trece pe reîncărcări periodice (cu ETag/304)
+    # și reîncearcă fluxul după Retry-After
+    if not sse_slots.acquire(blocking=False):
+        resp = jsonify({"error": "Prea multe conexiuni live"})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "30"
+        return resp
+
+    try:
+        client = broadcaster.subscribe(frozenset(dates))
+    except Exception:
+        sse_slots.release()
+        raise
+    released = threading.Event()
+
+    def cleanup():
+        # apelat de serverul WSGI la închiderea răspunsului, chiar dacă generatorul n-a pornit
+        if not released.is_set():
+            released.set()
+            broadcaster.unsubscribe(client)
+            sse_slots.release()
+
+    def stream():
+        yield "retry: 3000\n\n"
+        # reconectare: trimitem ce s-a pierdut între ultimul eveniment văzut și abonare
+        if 0 <= last_seen < client.start_id:
+            with get_db(readonly=True) as conn:
+                rows = conn.execute(
+                    f"SELECT * FROM slot_changes WHERE id > ? AND id <= ? "
+                    f"AND (date IS NULL OR date IN ({','.join('?' * len(dates))})) ORDER BY id",
+                    (last_seen, client.start_id, *dates)
+                ).fetchall()
+            if last_seen < client.start_id - SSE_LOG_KEEP:
+                yield sse_format("resync", {})   # o parte din jurnal a fost deja ștearsă
+            for row in rows:
+                yield sse_format("slot", change_event(row), row["id"])
+
+        deadline = _time.monotonic() + SSE_MAX_SECONDS
+        while _time.monotonic() < deadline:
+            if client.overflow:
+                # client prea lent: golim coada și îi cerem să reîncarce
+                while not client.events.empty():
+                    client.events.get_nowait()
+                client.overflow = False
+                yield sse_format("resync", {})
+            try:
+                event_id, data = client.events.get(timeout=SSE_KEEPALIVE)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            yield sse_format("slot", data, event_id)
+
+    resp = Response(stream(), mimetype="text/event-stream")
+    resp.call_on_close(cleanup)
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+
 # ======================================
 # ADMIN PANEL
 # ======================================
 
+ADMIN_COLUMNS = ("id", "email", "room", "date", "time", "machine", "created_at")
+
+
+def admin_filters(data):
+    """Clauza WHERE (fără cursor) pentru filtrele din panoul admin."""
+    where, params = [], []
+    for key, op in (("date_from", ">="), ("date_to", "<=")):
+        if data.get(key):
+            d = normalize_date(data[key])
+            if not d:
+                raise ValueError(key)
+            where.append(f"date {op} ?")
+            params.append(d)
+    for key in ("room", "machine", "email"):
+        if data.get(key):
+            if not isinstance(data[key], str):
+                raise ValueError(key)
+            where.append(f"{key} = ?")
+            params.append(data[key].strip().lower() if key == "email" else data[key])
+    return where, params
+
+
+def admin_page_rows(conn, where, params, after, limit):
+    """O pagină ordonată după (date, time, machine) — cheia unică — începând după cursor."""
+    where, params = list(where), list(params)
+    if after:
+        where.append("(date, time, machine) > (?, ?, ?)")
+        params.extend(after)
+    sql = f"SELECT {', '.join(ADMIN_COLUMNS)} FROM reservations"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY date, time, machine LIMIT ?"
+    return conn.execute(sql, params + [limit]).fetchall()
+
+
+def admin_request_data():
+    # JSON de la fetch() sau formular clasic (descărcare directă a exportului)
+    return request.get_json(silent=True) or request.form.to_dict()
+
+
 @app.route("/admin/list", methods=["POST"])
 def admin_list():
+    data = admin_request_data()
+    pwd = data.get("admin_password")
+    if pwd != ADMIN_PWD:
+        return jsonify({"success": False, "error": "Parolă incorectă"}), 403
+
+    try:
+        where, params = admin_filters(data)
+        limit = max(1, min(int(data.get("limit") or ADMIN_PAGE_SIZE), ADMIN_PAGE_MAX))
+        after = data.get("after")
+        if after is not None and (not isinstance(after, list) or len(after) != 3
+                                  or not all(isinstance(x, str) for x in after)):
+            raise ValueError("after")
+    except (ValueError, TypeError):
+        return jsonify({"success": False, "error": "Filtre invalide"}), 400
+
+    with get_db(readonly=True) as conn:
+        rows = admin_page_rows(conn, where, params, after, limit + 1)
+    result = [dict(r) for r in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = result[-1]
+        next_cursor = [last["date"], last["time"], last["machine"]]
+    return jsonify({"success": True, "reservations": result, "next": next_cursor})
+
+
+@app.route("/admin/export", methods=["POST"])
+def admin_export():
+    """Export NDJSON sau CSV, trimis în flux pe bucăți (fără a ține tot tabelul în memorie)."""
+    data = admin_request_data()
+    pwd = data.get("admin_password")
+    if pwd != ADMIN_PWD:
+        return jsonify({"success": False, "error": "Parolă incorectă"}), 403
+
+    fmt = (data.get("format") or "ndjson").lower()
+    if fmt not in ("ndjson", "csv"):
+        return jsonify({"success": False, "error": "Format necunoscut"}), 400
+    try:
+        where, params = admin_filters(data)
+    except ValueError:
+        return jsonify({"success": False, "error": "Filtre invalide"}), 400
+
+    def pages():
+        # fiecare bucată e o interogare scurtă separată: nu ținem un snapshot de citire deschis
+        after = None
+        while True:
+            with get_db(readonly=True) as conn:
+                rows = admin_page_rows(conn, where, params, after, EXPORT_CHUNK)
+            if not rows:
+                return
+            yield rows
+            if len(rows) < EXPORT_CHUNK:
+                return
+            after = (rows[-1]["date"], rows[-1]["time"], rows[-1]["machine"])
+
+    def ndjson():
+        for rows in pages():
+            yield "".join(json.dumps(dict(r), ensure_ascii=False) + "\n" for r in rows)
+
+    def csv_rows():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(ADMIN_COLUMNS)
+        for rows in pages():
+            writer.writerows(tuple(r) for r in rows)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+
+    if fmt == "csv":
+        resp = Response(csv_rows(), mimetype="text/csv")
+        resp.headers["Content-Disposition"] = "attachment; filename=rezervari.csv"
+    else:
+        resp = Response(ndjson(), mimetype="application/x-ndjson")
+        resp.headers["Content-Disposition"] = "attachment; filename=rezervari.ndjson"
+    return resp
+
+
+@app.route("/admin/emails", methods=["POST"])
+def admin_emails():
+    """Adaugă/șterge în bloc adrese din allow-list: {"add": [...], "remove": [...]}."""
     data = request.get_json()
     pwd = data.get("admin_password")
     if pwd != ADMIN_PWD:
         return jsonify({"success": False, "error": "Parolă incorectă"}), 403
 
-    with get_db() as conn:
-        rows = conn.execute("SELECT * FROM reservations ORDER BY date, time").fetchall()
-        result = [dict(r) for r in rows]
-    return jsonify({"success": True, "reservations": result})
+    add, remove = data.get("add") or [], data.get("remove") or []
+    if not isinstance(add, list) or not isinstance(remove, list):
+        return jsonify({"success": False, "error": "Date incomplete"}), 400
+    invalide = [e for e in add if not isinstance(e, str) or
+                not re.match(r"[^@\s]+@[^@\s]+\.[^@\s]+$", e.strip())]
+    if invalide:
+        return jsonify({"success": False, "error": "Format email invalid", "invalid": invalide}), 400
+    if not add and not remove:
+        return jsonify({"success": True, "emails": allowed_emails.entries()})
+
+    added, removed, total = allowed_emails.update(add, [e for e in remove if isinstance(e, str)])
+    return jsonify({"success": True, "added": added, "removed": removed, "total": total})
 
 
 @app.route("/admin/delete_one", methods=["POST"])
@@ -241,8 +1470,12 @@ def admin_delete_one():
     pwd, rid = data.get("admin_password"), data.get("id")
     if pwd != ADMIN_PWD:
         return jsonify({"success": False, "error": "Parolă incorectă"}), 403
-    with get_db() as conn:
-        conn.execute("DELETE FROM reservations WHERE id=?", (rid,))
+    with get_db(immediate=True) as conn:
+        rows = conn.execute("DELETE FROM reservations WHERE id=? RETURNING date, time, machine", (rid,)).fetchall()
+        for r in rows:
+            log_change(conn, r["date"], r["time"], r["machine"])
+    for r in rows:
+        occupancy.set_slot(r["date"], r["time"], r["machine"], None)
     return jsonify({"success": True})
 
 
@@ -252,9 +1485,29 @@ def admin_delete_all():
     pwd = data.get("admin_password")
     if pwd != ADMIN_PWD:
         return jsonify({"success": False, "error": "Parolă incorectă"}), 403
-    with get_db() as conn:
-        conn.execute("DELETE FROM reservations")
-    return jsonify({"success": True})
+    deleted, _ = delete_in_chunks(reset_all=True)
+    return jsonify({"success": True, "deleted": deleted})
+
+
+@app.route("/admin/delete_range", methods=["POST"])
+def admin_delete_range():
+    """Șterge rezervările din [date_from, date_to] în bucăți mici."""
+    data = request.get_json()
+    pwd = data.get("admin_password")
+    if pwd != ADMIN_PWD:
+        return jsonify({"success": False, "error": "Parolă incorectă"}), 403
+
+    date_from, date_to = normalize_date(data.get("date_from")), normalize_date(data.get("date_to"))
+    if not date_from or not date_to or date_to < date_from:
+        return jsonify({"success": False, "error": "Interval invalid"}), 400
+    try:
+        chunk = max(1, min(int(data.get("chunk") or DELETE_CHUNK), 5000))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "Interval invalid"}), 400
+
+    deleted, batches = delete_in_chunks("date BETWEEN ? AND ?", (date_from, date_to), chunk)
+    log_event("admin_delete_range", date_from=date_from, date_to=date_to, deleted=deleted, batches=batches)
+    return jsonify({"success": True, "deleted": deleted, "batches": batches})
 
 
 # ======================================
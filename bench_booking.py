@@ -0,0 +1,119 @@
+"""Test de stres pentru /api/book pe o bază de date temporară.
+
+Lansează mai multe procese, fiecare cu mai multe thread-uri, care încearcă
+să rezerve simultan aceleași sloturi. La final raportează throughput-ul,
+latențele (p50/p99) și eventualele încălcări ale invarianților:
+  - cel mult MAX_REZERVARI_PE_ZI rezervări per utilizator și zi
+  - cel mult o rezervare per (dată, oră, mașină)
+  - fiecare răspuns de succes corespunde unui rând din DB
+
+Rulare:  python bench_booking.py --procs 4 --threads 8 --requests 50
+"""
+
+import argparse, multiprocessing as mp, os, random, sqlite3, sys, tempfile, time
+
+DATA = "2030-01-15"
+
+
+def worker(db_path, wid, threads, requests, users, queue):
+    os.environ["DB_PATH"] = db_path
+    os.environ["RETENTION_ENABLED"] = "0"   # thread-ul de retenție ar distorsiona măsurătoarea
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import threading
+    import app as t5
+    t5.log.disabled = True   # fără evenimente "booked" pe stdout în timpul măsurătorii
+
+    rezultate = []
+    lock = threading.Lock()
+
+    def run(tid):
+        rnd = random.Random(wid * 1000 + tid)
+        client = t5.app.test_client()
+        local = []
+        for _ in range(requests):
+            email = f"user{rnd.randrange(users)}@t5.test"
+            with client.session_transaction() as s:
+                s["email"] = email
+            body = {"date": DATA, "time": rnd.choice(t5.ORE), "machine": rnd.choice(t5.MASINI), "room": "1A"}
+            t0 = time.perf_counter()
+            r = client.post("/api/book", json=body)
+            dt = time.perf_counter() - t0
+            data = r.get_json()
+            local.append((dt, email, data.get("success", False), data.get("reason")))
+        with lock:
+            rezultate.extend(local)
+
+    ts = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    t5.close_db_connections()
+    queue.put(rezultate)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--procs", type=int, default=4)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=50, help="cereri per thread")
+    ap.add_argument("--users", type=int, default=40)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="t5-bench-")
+    db_path = os.path.join(tmp, "database.db")
+    os.environ["DB_PATH"] = db_path
+    os.environ["RETENTION_ENABLED"] = "0"
+
+    # creează schema (și migrările) o singură dată, înainte de pornirea proceselor
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as t5
+    t5.close_db_connections()
+
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(db_path, i, args.threads, args.requests, args.users, queue))
+             for i in range(args.procs)]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    rezultate = []
+    for _ in procs:
+        rezultate.extend(queue.get())
+    for p in procs:
+        p.join()
+    durata = time.perf_counter() - t0
+
+    lat = sorted(r[0] for r in rezultate)
+    reusite = sum(1 for r in rezultate if r[2])
+    motive = {}
+    for r in rezultate:
+        if not r[2]:
+            motive[r[3]] = motive.get(r[3], 0) + 1
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0]
+    peste_cota = conn.execute(
+        "SELECT COUNT(*) FROM (SELECT email FROM reservations GROUP BY email, date HAVING COUNT(*) > ?)",
+        (t5.MAX_REZERVARI_PE_ZI,)).fetchone()[0]
+    duplicate = conn.execute(
+        "SELECT COUNT(*) FROM (SELECT 1 FROM reservations GROUP BY date, time, machine HAVING COUNT(*) > 1)"
+    ).fetchone()[0]
+    conn.close()
+
+    def pct(p):
+        return lat[min(len(lat) - 1, int(p * len(lat)))] * 1000
+
+    print(f"cereri:        {len(rezultate)} ({args.procs} procese x {args.threads} thread-uri)")
+    print(f"durată:        {durata:.2f} s  ->  {len(rezultate) / durata:.0f} cereri/s")
+    print(f"latență:       p50 {pct(0.50):.1f} ms, p99 {pct(0.99):.1f} ms, max {lat[-1] * 1000:.1f} ms")
+    print(f"reușite:       {reusite}, respinse: {motive}")
+    violari = peste_cota + duplicate + abs(rows - reusite)
+    print(f"încălcări:     peste cotă={peste_cota}, sloturi duble={duplicate}, "
+          f"rânduri în DB={rows} vs reușite={reusite}")
+    print("OK" if violari == 0 else "EȘEC")
+    return 0 if violari == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Verificare a migrărilor pe o bază de date mare, în formatul vechi.
+
+Construiește într-un director temporar o bază cu schema inițială (fără
+indexuri, user_version=0) și date DD-MM-YYYY, rulează init_db() și verifică:
+  - toate datele au devenit YYYY-MM-DD
+  - un slot salvat în ambele formate a rămas o singură dată
+  - PRAGMA user_version == len(MIGRATIONS)
+  - planurile interogărilor principale folosesc indexurile
+
+Rulare:  python check_migrations.py --days 400
+"""
+
+import argparse, os, random, sqlite3, sys, tempfile, time
+
+SCHEMA_V0 = """
+    CREATE TABLE reservations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT NOT NULL,
+        room TEXT NOT NULL,
+        date TEXT NOT NULL,
+        time TEXT NOT NULL,
+        machine TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(date, time, machine)
+    )
+"""
+
+# slotul salvat în ambele formate (rândul ISO trebuie păstrat)
+DUP_ISO, DUP_OLD = "2020-01-01", "01-01-2020"
+
+
+def build_old_db(path, days, users):
+    rnd = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.execute(SCHEMA_V0)
+    rows = []
+    for d in range(days):
+        ziua = time.gmtime(time.mktime((2020, 1, 1 + d, 12, 0, 0, 0, 0, -1)))
+        data = time.strftime("%d-%m-%Y", ziua)
+        for h in range(7, 23):
+            for m in range(1, 5):
+                if rnd.random() < 0.6:
+                    rows.append((f"u{rnd.randrange(users)}@t5.test", "1A", data, f"{h:02d}:00", f"Mașina {m}"))
+    conn.executemany("INSERT OR IGNORE INTO reservations (email, room, date, time, machine) VALUES (?, ?, ?, ?, ?)",
+                     rows)
+    conn.execute("DELETE FROM reservations WHERE date=? AND time='07:00' AND machine='Mașina 1'", (DUP_OLD,))
+    conn.execute("INSERT INTO reservations (email, room, date, time, machine) VALUES ('iso@t5.test', '1A', ?, "
+                 "'07:00', 'Mașina 1')", (DUP_ISO,))
+    conn.execute("INSERT INTO reservations (email, room, date, time, machine) VALUES ('old@t5.test', '1A', ?, "
+                 "'07:00', 'Mașina 1')", (DUP_OLD,))
+    conn.commit()
+    total = conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0]
+    conn.close()
+    return total
+
+
+def plan(conn, sql, params):
+    return " | ".join(r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--days", type=int, default=400)
+    ap.add_argument("--users", type=int, default=2000)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="t5-migr-")
+    db_path = os.path.join(tmp, "database.db")
+    total = build_old_db(db_path, args.days, args.users)
+    print(f"bază veche:    {total} rânduri ({args.days} zile)")
+
+    os.environ["DB_PATH"] = db_path
+    os.environ["RETENTION_ENABLED"] = "0"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    t0 = time.perf_counter()
+    import app as t5      # init_db() rulează la import
+    t5.log.disabled = True
+    t5.init_db()          # a doua rulare nu trebuie să schimbe nimic
+    print(f"migrare:       {time.perf_counter() - t0:.2f} s")
+
+    erori = []
+
+    def check(cond, msg):
+        print(f"  {'OK ' if cond else 'EȘEC'} {msg}")
+        if not cond:
+            erori.append(msg)
+
+    with t5.get_db(readonly=True) as conn:
+        versiune = conn.execute("PRAGMA user_version").fetchone()[0]
+        check(versiune == len(t5.MIGRATIONS), f"user_version={versiune} (așteptat {len(t5.MIGRATIONS)})")
+
+        vechi = conn.execute("SELECT COUNT(*) FROM reservations "
+                             "WHERE date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'").fetchone()[0]
+        check(vechi == 0, f"date ne-ISO rămase: {vechi}")
+
+        dup = conn.execute("SELECT email FROM reservations WHERE date=? AND time='07:00' AND machine='Mașina 1'",
+                           (DUP_ISO,)).fetchall()
+        check([r["email"] for r in dup] == ["iso@t5.test"], f"slot dublu deduplicat: {[r['email'] for r in dup]}")
+
+        rows = conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0]
+        check(rows == total - 1, f"rânduri după migrare: {rows} (așteptat {total - 1})")
+
+        interogari = [
+            ("cotă zilnică", "SELECT COUNT(*) FROM reservations WHERE email=? AND date=?",
+             ("u1@t5.test", DUP_ISO), ("idx_reservations_email_date",)),
+            ("rezervările mele", "SELECT id, date, time, machine, room FROM reservations WHERE email=? ORDER BY date, time",
+             ("u1@t5.test",), ("idx_reservations_email_date",)),
+            ("grila unei zile", "SELECT time, machine, room FROM reservations WHERE date=?",
+             (DUP_ISO,), ("idx_reservations_date_time",)),
+            ("ocupare pe interval",
+             "SELECT date, time, COUNT(*) AS n FROM reservations WHERE date BETWEEN ? AND ? GROUP BY date, time",
+             ("2020-01-01", "2020-01-31"), ("idx_reservations_date_time", "sqlite_autoindex_reservations_1")),
+        ]
+        for nume, sql, params, indexuri in interogari:
+            p = plan(conn, sql, params)
+            check(any(f"INDEX {i}" in p for i in indexuri) and "SCAN reservations" not in p, f"{nume}: {p}")
+
+    t5.close_db_connections()
+    print("OK" if not erori else "EȘEC")
+    return 1 if erori else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())